@@ -0,0 +1,140 @@
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from core.retina import RetinaProcessor
+
+_END = object()
+
+
+class AsyncRetina:
+    """
+    asyncio 原生的流式接口
+        async with AsyncRetina(mode=3, max_in_flight=4) as retina:
+            async for output, hist in retina.stream(source):
+                ...
+    process_frame 是阻塞调用，这里把它丢进线程池 (OpenCV 计算时会释放 GIL)，
+    事件循环本身始终不被阻塞，一个进程可以同时服务多路流。
+
+    - 隔离：每路 stream 有自己的 RetinaProcessor，EMA 统计、变化感知缓存这类跨帧状态
+      只看到本路的帧，并且按顺序逐帧处理
+    - 并行：不同的流在线程池里并行，max_workers 限制同时计算的流数
+    - 背压：每路流最多预读 max_in_flight 帧，队列满了就暂停读取源
+    - 取消：stream 被取消或提前退出时，预读任务随之取消
+    """
+
+    def __init__(self, mode=3, max_in_flight=2, processor_factory=RetinaProcessor,
+                 executor=None, max_workers=None):
+        self.mode = mode
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._factory = processor_factory
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers,
+                                                        thread_name_prefix="retina")
+        self._params = None
+        # process() 单帧接口用的处理器；各路 stream 的处理器只弱引用，流结束即释放
+        self.processor = processor_factory()
+        self._lock = None   # asyncio.Lock 需要在事件循环里创建
+        self._streams = weakref.WeakSet()
+
+    @property
+    def processors(self):
+        """单帧接口的处理器 + 当前所有活动流的处理器。"""
+        return [self.processor] + list(self._streams)
+
+    def update_params(self, s1, s2, gain=10.0):
+        # 之后新开的流也沿用这组参数
+        self._params = (s1, s2, gain)
+        for p in self.processors:
+            p.update_params(s1, s2, gain)
+
+    def _new_processor(self):
+        processor = self._factory()
+        if self._params is not None:
+            processor.update_params(*self._params)
+        self._streams.add(processor)
+        return processor
+
+    async def _run(self, processor, frame, mode):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, processor.process_frame, frame, mode)
+
+    async def process(self, frame, mode=None):
+        """异步处理单帧，返回值与 RetinaProcessor.process_frame 相同。"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        mode = self.mode if mode is None else mode
+        async with self._lock:
+            # 加锁直到线程里的计算结束，即使调用方被取消也不会让两帧同时用这个处理器
+            fut = asyncio.ensure_future(self._run(self.processor, frame, mode))
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                await asyncio.gather(fut, return_exceptions=True)
+                raise
+
+    async def stream(self, source, mode=None, processor=None):
+        """
+        source 可以是 async 可迭代对象、普通可迭代对象，
+        或者带 read() 的 VideoCapture 类对象 (StimulusSource / FrameStoreReader 等)。
+        processor 不传时为这路流新建一个，结果按输入帧的顺序产出。
+        """
+        mode = self.mode if mode is None else mode
+        if processor is None:
+            processor = self._new_processor()
+        queue = asyncio.Queue(maxsize=self.max_in_flight)
+        reader = asyncio.ensure_future(self._fill(source, queue))
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                # 同一路流的帧在同一个处理器上逐帧处理，读取则在后台继续预读
+                yield await self._run(processor, item, mode)
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+    async def _fill(self, source, queue):
+        frames = self._frames(source)
+        try:
+            async for frame in frames:
+                # 背压：队列满时 put 会挂起，源也就不再被读取
+                await queue.put(frame)
+            await queue.put(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await frames.aclose()
+
+    async def _frames(self, source):
+        if hasattr(source, "__aiter__"):
+            async for frame in source:
+                yield frame.copy()
+        elif hasattr(source, "read"):
+            # 摄像头的 read() 会阻塞，放到默认线程池里，不占处理线程
+            loop = asyncio.get_running_loop()
+            while True:
+                ret, frame = await loop.run_in_executor(None, source.read)
+                if not ret:
+                    return
+                # 很多源会复用输出缓冲区，预读的帧必须各自持有一份
+                yield frame.copy()
+        else:
+            for frame in source:
+                yield frame.copy()
+                await asyncio.sleep(0)
+
+    async def aclose(self):
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
@@ -0,0 +1,207 @@
+import json
+import os
+import queue
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+FRAMES_FILE = "frames.u8"
+INDEX_FILE = "index.json"
+
+
+def build_frame_store(source, path, max_frames=None, gray=False):
+    """
+    把任意视频 (文件路径，或任何带 read() 的 VideoCapture 类对象) 解码一次，
+    写成 "原始 uint8 帧 + 索引" 的帧仓库目录：
+        path/frames.u8   所有帧首尾相接的原始字节
+        path/index.json  尺寸、帧数、fps 以及每帧的时间戳
+    之后反复调 σ 跑同一段录像时，就不用每次都重新走 OpenCV 解码了。
+    """
+    own_cap = isinstance(source, (str, os.PathLike))
+    cap = cv2.VideoCapture(os.fspath(source)) if own_cap else source
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video source: {source}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    os.makedirs(path, exist_ok=True)
+    shape = None
+    timestamps = []
+
+    try:
+        with open(os.path.join(path, FRAMES_FILE), "wb") as f:
+            while max_frames is None or len(timestamps) < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if gray and frame.ndim == 3:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                if frame.dtype != np.uint8:
+                    frame = frame.astype(np.uint8)
+                if shape is None:
+                    shape = frame.shape
+                elif frame.shape != shape:
+                    raise ValueError(f"Frame size changed mid-stream: {shape} -> {frame.shape}")
+                f.write(np.ascontiguousarray(frame).tobytes())
+                timestamps.append(len(timestamps) / fps)
+    finally:
+        if own_cap:
+            cap.release()
+
+    if shape is None:
+        raise ValueError(f"No frames could be read from: {source}")
+
+    index = {
+        "version": 1,
+        "height": shape[0],
+        "width": shape[1],
+        "channels": shape[2] if len(shape) == 3 else 1,
+        "count": len(timestamps),
+        "fps": fps,
+        "timestamps": timestamps,
+    }
+    with open(os.path.join(path, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+    return FrameStore(path)
+
+
+class FrameStore:
+    """
+    基于 numpy.memmap 的帧仓库，支持 O(1) 随机访问：
+        store = FrameStore("clip_store")
+        frame = store[120]
+    所有帧大小相同，第 i 帧的偏移就是 i * 帧字节数，不需要任何查找。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.index = json.load(f)
+
+        self.fps = self.index["fps"]
+        self.timestamps = self.index["timestamps"]
+        h, w, c = self.index["height"], self.index["width"], self.index["channels"]
+        self.frame_shape = (h, w, c) if c > 1 else (h, w)
+        self.frames = np.memmap(os.path.join(path, FRAMES_FILE), dtype=np.uint8, mode="r",
+                                shape=(self.index["count"],) + self.frame_shape)
+
+    def __len__(self):
+        return self.frames.shape[0]
+
+    def __getitem__(self, i):
+        return self.frames[i]
+
+    def reader(self, start=0, stop=None, step=1, prefetch=8, loop=False):
+        """返回一个 VideoCapture 风格的读取器，后台线程提前把帧读进内存。"""
+        return FrameStoreReader(self, start, stop, step, prefetch, loop)
+
+
+class FrameStoreReader:
+    """
+    带预读的帧仓库读取器，接口与 cv2.VideoCapture 一致，可以直接替换 MainWindow.cap。
+    后台线程按顺序把 memmap 里的帧拷贝成连续数组放进有界队列，
+    主线程 read() 时基本只剩一次出队，重复处理同一段录像就变成了纯内存带宽的事。
+    """
+
+    _END = object()
+
+    def __init__(self, store, start=0, stop=None, step=1, prefetch=8, loop=False):
+        self.store = store
+        self.indices = range(start, len(store) if stop is None else min(stop, len(store)), step)
+        self.loop = loop
+        self.queue = queue.Queue(maxsize=max(1, prefetch))
+        self._stop = threading.Event()
+        self._opened = True
+        self.pos = 0
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while not self._stop.is_set():
+            for i in self.indices:
+                # np.array 会真正触发缺页读盘，这一步放在后台线程完成
+                frame = np.array(self.store.frames[i])
+                if not self._put((i, frame)):
+                    return
+            if not self.loop or not len(self.indices):
+                break
+        self._put(self._END)
+
+    def _put(self, item):
+        # 带超时地入队，这样 release() 之后线程能及时退出
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        item = self.queue.get()
+        if item is self._END:
+            self._opened = False
+            return False, None
+        self.pos, frame = item
+        return True, frame
+
+    def qsize(self):
+        """预读队列里已就绪的帧数。"""
+        return self.queue.qsize()
+
+    def release(self):
+        self._opened = False
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.store.fps)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.indices))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.pos)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.store.frame_shape[0])
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.store.frame_shape[1])
+        return 0.0
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield frame
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect a PyRetina frame store.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="decode a video once into raw uint8 frames")
+    p_build.add_argument("video")
+    p_build.add_argument("store")
+    p_build.add_argument("--max-frames", type=int, default=None)
+    p_build.add_argument("--gray", action="store_true", help="store single-channel frames")
+    p_info = sub.add_parser("info", help="print the store index summary")
+    p_info.add_argument("store")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        store = build_frame_store(args.video, args.store, args.max_frames, args.gray)
+    else:
+        store = FrameStore(args.store)
+    print(f"{store.path}: {len(store)} frames, shape={store.frame_shape}, fps={store.fps:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
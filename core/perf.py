@@ -0,0 +1,99 @@
+import collections
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:   # psutil 是可选依赖，没有就退回到 getrusage 的峰值内存
+    psutil = None
+
+try:
+    import resource
+except ImportError:   # Windows 没有 resource 模块
+    resource = None
+
+
+class PerfCounters:
+    """
+    轻量性能计数器
+    只在关键位置记录 time.perf_counter() 的差值，放进定长 deque，
+    统计 (均值、fps) 留到 snapshot() 时才算，界面按节流频率去取即可。
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self.stages = collections.OrderedDict()   # 阶段名 -> 最近若干次耗时 (ms)
+        self.pipeline_stages = collections.OrderedDict()   # 流水线内部各阶段，同上
+        self._pipeline_current = ()   # 最近一帧实际跑过的流水线阶段
+        self.frame_times = collections.deque(maxlen=window)
+        self.frames = 0
+        self.dropped = 0
+        self._process = psutil.Process() if psutil is not None else None
+        # 没有 psutil 时只能拿到 getrusage 的峰值常驻内存，界面据此标注
+        self.memory_is_peak = self._process is None
+
+    @contextmanager
+    def timed(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000.0)
+
+    def record(self, name, ms):
+        self._append(self.stages, name, ms)
+
+    def record_pipeline(self, timings):
+        """记录一帧的流水线阶段耗时 (RetinaProcessor.last_timings)。"""
+        for name, ms in timings.items():
+            self._append(self.pipeline_stages, name, ms)
+        self._pipeline_current = tuple(timings)
+
+    def _append(self, table, name, ms):
+        samples = table.get(name)
+        if samples is None:
+            samples = table[name] = collections.deque(maxlen=self.window)
+        samples.append(ms)
+
+    def mark_frame(self):
+        self.frames += 1
+        self.frame_times.append(time.perf_counter())
+
+    def mark_dropped(self, n=1):
+        self.dropped += n
+
+    def fps(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        span = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def memory_mb(self):
+        if self._process is not None:
+            return self._process.memory_info().rss / 1e6
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位是 KB，macOS 是字节
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+    def snapshot(self):
+        return {
+            "fps": self.fps(),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "memory_mb": self.memory_mb(),
+            "stages_ms": {name: sum(s) / len(s) for name, s in self.stages.items() if s},
+            # 只包含最近一帧用到的阶段，切换模式后旧阶段不再出现
+            "pipeline_ms": {name: sum(s) / len(s) for name, s in
+                            ((n, self.pipeline_stages[n]) for n in self._pipeline_current) if s},
+        }
+
+    def reset(self):
+        self.stages.clear()
+        self.pipeline_stages.clear()
+        self._pipeline_current = ()
+        self.frame_times.clear()
+        self.frames = 0
+        self.dropped = 0
@@ -0,0 +1,320 @@
+import collections
+import time
+
+import cv2
+import numpy as np
+
+# ================= 阶段注册表 =================
+# 每个阶段是一个函数 fn(ctx, src, **params) -> output
+# src 是上一阶段的输出 (第一个阶段拿到的是原始帧)，可以是 numpy 数组也可以是 UMat
+STAGES = {}
+STATEFUL_STAGES = set()
+
+# 可融合的相邻阶段: (前一个阶段名, 后一个阶段名) -> fn(ctx, src, params_a, params_b)
+FUSIONS = {}
+
+
+def register_stage(name, stateful=False):
+    """注册一个流水线阶段。stateful 阶段 (如时域滤波) 跨帧保存状态，不参与帧内共享。"""
+    def decorator(fn):
+        STAGES[name] = fn
+        if stateful:
+            STATEFUL_STAGES.add(name)
+        return fn
+    return decorator
+
+
+def register_fusion(first, second):
+    """注册两个相邻阶段的融合实现，编译流水线时会自动替换成单次执行。"""
+    def decorator(fn):
+        FUSIONS[(first, second)] = fn
+        return fn
+    return decorator
+
+
+def _signature(name, params):
+    return (name, tuple(sorted(params.items())))
+
+
+class FrameContext:
+    """
+    单帧的计算上下文。
+    所有中间结果按 "血统 (lineage)" 缓存：同一帧上跑多条流水线时，
+    只要前缀相同 (比如都以 gray 开头，或者用到同一个 σ 的高斯模糊)，就只算一次。
+    """
+
+    def __init__(self, frame, channels=3, tile_cache=None):
+        self.frame = frame
+        # UMat 拿不到 shape，由调用方告知原始帧的通道数；
+        # channels 是当前中间结果的通道数，改变通道数的阶段负责更新它
+        self.frame_channels = channels
+        self.channels = channels
+        self.channel_map = {}   # 血统 -> 该中间结果的通道数，缓存命中时恢复
+        self.tile_cache = tile_cache
+        self.dirty_ratio = None
+        self.cache = {}
+        self.outputs = {}   # 旁路输出，比如直方图
+        self.timings = {}   # 每个 (融合后的) 阶段的耗时 ms，供性能面板使用
+        self.lineage = ()   # 当前阶段输入的血统，阶段内部可以据此共享子计算
+
+    def memo(self, key, fn):
+        if key not in self.cache:
+            self.cache[key] = fn()
+        return self.cache[key]
+
+
+class Pipeline:
+    """
+    可组合的视网膜回路。
+        circuit = Pipeline().add("gray").add("dog", sigma1=1.0, sigma2=3.0)
+        out = circuit.run(FrameContext(u_frame))
+    相邻且登记在 FUSIONS 里的阶段会在编译时合并为一次执行。
+    """
+
+    def __init__(self, stages=()):
+        self.stages = []
+        self._state = {}
+        self._compiled = None
+        for stage in stages:
+            if isinstance(stage, str):
+                self.add(stage)
+            else:
+                self.add(stage[0], **stage[1])
+
+    def add(self, name, **params):
+        if name not in STAGES:
+            raise KeyError(f"Unknown pipeline stage: {name!r} (registered: {sorted(STAGES)})")
+        self.stages.append((name, params))
+        self._compiled = None
+        return self
+
+    def reset(self):
+        """清空时域阶段的跨帧状态。"""
+        # 编译好的闭包持有的是这些 dict 本身，必须原地清空而不是换新的
+        for state in self._state.values():
+            state.clear()
+
+    def compile(self):
+        """把可融合的相邻阶段合并，返回 [(血统签名, 执行函数, 是否有状态, 计时标签), ...]。"""
+        steps = []
+        i = 0
+        while i < len(self.stages):
+            name, params = self.stages[i]
+            sig = (_signature(name, params),)
+            if i + 1 < len(self.stages):
+                next_name, next_params = self.stages[i + 1]
+                fused = FUSIONS.get((name, next_name))
+                if fused is not None:
+                    # 融合后的签名等于两步的签名相连，和未融合时的血统保持一致
+                    sig += (_signature(next_name, next_params),)
+                    steps.append((sig, self._bind_fused(fused, params, next_params), False))
+                    i += 2
+                    continue
+            stateful = name in STATEFUL_STAGES
+            steps.append((sig, self._bind(i, name, params, stateful), stateful))
+            i += 1
+
+        # 计时标签：同名阶段出现多次时按出现顺序编号 (dog, dog#2, ...)，避免互相覆盖
+        names = ["+".join(s[0] for s in sig) for sig, _, _ in steps]
+        totals = collections.Counter(names)
+        seen = collections.Counter()
+        labels = []
+        for label in names:
+            seen[label] += 1
+            labels.append(f"{label}#{seen[label]}" if totals[label] > 1 else label)
+        self._compiled = [step + (label,) for step, label in zip(steps, labels)]
+        return self._compiled
+
+    def _bind(self, index, name, params, stateful):
+        fn = STAGES[name]
+        if stateful:
+            state = self._state.setdefault(index, {})
+            return lambda ctx, src: fn(ctx, src, state=state, **params)
+        return lambda ctx, src: fn(ctx, src, **params)
+
+    @staticmethod
+    def _bind_fused(fn, params_a, params_b):
+        return lambda ctx, src: fn(ctx, src, params_a, params_b)
+
+    def run(self, ctx):
+        steps = self._compiled if self._compiled is not None else self.compile()
+        out = ctx.frame
+        ctx.channels = ctx.frame_channels
+        lineage = ()
+        for sig, fn, stateful, label in steps:
+            if stateful:
+                # 有状态阶段的输出取决于这条流水线自己的历史，不能和别的流水线共享
+                sig = sig + (id(self),)
+            ctx.lineage = lineage
+            key = lineage + sig
+            src = out
+            t0 = time.perf_counter()
+            if key in ctx.cache:
+                out = ctx.cache[key]
+                ctx.channels = ctx.channel_map[key]
+            else:
+                out = ctx.cache[key] = fn(ctx, src)
+                ctx.channel_map[key] = ctx.channels
+            ctx.timings[label] = (time.perf_counter() - t0) * 1000.0
+            lineage = key
+        return out
+
+
+# ================= 内置阶段 =================
+
+@register_stage("gray")
+def _gray(ctx, src):
+    if isinstance(src, cv2.UMat):
+        channels = ctx.channels
+    else:
+        channels = src.shape[2] if src.ndim == 3 else 1
+    ctx.channels = 1
+    if channels == 1:
+        return src
+    return cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+
+
+@register_stage("to_bgr")
+def _to_bgr(ctx, src):
+    if isinstance(src, cv2.UMat):
+        channels = ctx.channels
+    else:
+        channels = src.shape[2] if src.ndim == 3 else 1
+    ctx.channels = 3
+    if channels == 3:
+        return src
+    return cv2.cvtColor(src, cv2.COLOR_GRAY2BGR)
+
+
+@register_stage("normalize")
+def _normalize(ctx, src, alpha=0.0, beta=1.0, dtype=cv2.CV_32F):
+    return cv2.normalize(src, None, alpha, beta, cv2.NORM_MINMAX, dtype=dtype)
+
+
+@register_stage("to_float")
+def unit_float(ctx, src):
+    """
+    8 位强度 -> float32，固定按 1/255 缩放 (满量程 = 1.0)。
+    DoG 的输入统一走这里 (包括变化感知缓存和参数扫描)，
+    这样带符号响应的数值是绝对的，不随每帧的 min/max 漂移，静默阈值在各处含义一致。
+    addWeighted 对 UMat 和多通道都适用。
+    """
+    return cv2.addWeighted(src, 1.0 / 255.0, src, 0.0, 0.0, dtype=cv2.CV_32F)
+
+
+@register_stage("to_uint8")
+def _to_uint8(ctx, src):
+    return cv2.convertScaleAbs(src)
+
+
+@register_stage("blur")
+def _blur(ctx, src, sigma=1.0):
+    return cv2.GaussianBlur(src, (0, 0), sigma)
+
+
+@register_stage("dog")
+def _dog(ctx, src, sigma1=1.0, sigma2=2.0):
+    if ctx.tile_cache is not None:
+        gray = src.get() if isinstance(src, cv2.UMat) else src
+        if gray.dtype == np.uint8 and gray.ndim == 2:
+            # 变化感知模式：只重算脏 tile，每个 DoG 阶段 (血统 + σ) 各用一份缓存
+            cache = ctx.tile_cache.get(ctx.lineage + (sigma1, sigma2))
+            dog = cache.update(gray, sigma1, sigma2)
+            # 多个 DoG 阶段时报告最大的脏块比例
+            ctx.dirty_ratio = max(ctx.dirty_ratio or 0.0, cache.dirty_ratio)
+            return cv2.UMat(dog) if isinstance(src, cv2.UMat) else dog
+
+    # 浮点转换与两次模糊都按血统缓存，同一帧上不同 DoG 共用同一个 σ 的模糊结果
+    norm_key = ctx.lineage + (_signature("to_float", {}),)
+    u_float = ctx.memo(norm_key, lambda: unit_float(ctx, src))
+    g1 = ctx.memo(norm_key + (_signature("blur", {"sigma": sigma1}),),
+                  lambda: _blur(ctx, u_float, sigma1))
+    g2 = ctx.memo(norm_key + (_signature("blur", {"sigma": sigma2}),),
+                  lambda: _blur(ctx, u_float, sigma2))
+    return cv2.subtract(g1, g2)
+
+
+@register_stage("canny")
+def _canny(ctx, src, low=100, high=200):
+    ctx.channels = 1
+    return cv2.Canny(src, low, high)
+
+
+@register_stage("colormap")
+def _colormap(ctx, src, cmap=cv2.COLORMAP_JET):
+    ctx.channels = 3
+    return cv2.applyColorMap(src, cmap)
+
+
+@register_stage("threshold")
+def _threshold(ctx, src, thresh=127, maxval=255, kind=cv2.THRESH_BINARY):
+    _, out = cv2.threshold(src, thresh, maxval, kind)
+    return out
+
+
+@register_stage("histogram")
+def _histogram(ctx, src):
+    # 旁路阶段：结果写进 ctx.outputs，图像原样向下游传递
+    ctx.outputs["hist"] = draw_histogram(src)
+    return src
+
+
+@register_stage("tap")
+def _tap(ctx, src, key="tap"):
+    # 旁路阶段：把当前中间结果 (比如带符号的 DoG) 暴露给调用方
+    ctx.outputs[key] = src
+    return src
+
+
+@register_stage("temporal", stateful=True)
+def _temporal(ctx, src, alpha=0.5, state=None):
+    """时域高通: 输出 = 当前帧 - 指数滑动平均，静止背景会逐渐被抑制。"""
+    # addWeighted 顺便完成到 float32 的转换，对 UMat 和多通道都适用
+    cur = cv2.addWeighted(src, 1.0, src, 0.0, 0.0, dtype=cv2.CV_32F)
+    avg = state.get("avg")
+    if avg is None:
+        state["avg"] = cur
+        return cv2.subtract(cur, cur)
+    out = cv2.subtract(cur, avg)
+    state["avg"] = cv2.addWeighted(cur, alpha, avg, 1.0 - alpha, 0)
+    return out
+
+
+# ================= 内置融合 =================
+
+@register_fusion("blur", "blur")
+def _fuse_blur_blur(ctx, src, a, b):
+    # 两次高斯级联等价于一次 σ = sqrt(σa² + σb²) 的高斯
+    sigma = float(np.hypot(a.get("sigma", 1.0), b.get("sigma", 1.0)))
+    return cv2.GaussianBlur(src, (0, 0), sigma)
+
+
+@register_fusion("normalize", "to_uint8")
+def _fuse_normalize_uint8(ctx, src, a, b):
+    alpha, beta = a.get("alpha", 0.0), a.get("beta", 1.0)
+    if min(alpha, beta) < 0:
+        # 目标区间含负数时 convertScaleAbs 会取绝对值，不能直接合并
+        return _to_uint8(ctx, _normalize(ctx, src, **a))
+    # 归一化直接输出 8 位，省掉一整帧的 float 中间结果
+    return cv2.normalize(src, None, alpha, beta, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+
+
+def draw_histogram(src_img):
+    if src_img is None: return None
+    if isinstance(src_img, cv2.UMat):
+        src_img = src_img.get()
+
+    if len(src_img.shape) == 3:
+        gray = cv2.cvtColor(src_img, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = src_img
+
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+    cv2.normalize(hist, hist, 0, 100, cv2.NORM_MINMAX)
+
+    h, w = 100, 256
+    hist_img = np.zeros((h, w, 3), dtype=np.uint8)
+    cv2.line(hist_img, (0, 50), (256, 50), (40, 40, 40), 1)
+    points = np.column_stack((np.arange(256), h - hist.ravel().astype(np.int32)))
+    cv2.polylines(hist_img, [points.astype(np.int32)], False, (0, 255, 0), 1)
+    return hist_img
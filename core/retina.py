@@ -1,5 +1,9 @@
+import time
 import cv2
 import numpy as np
+from core.pipeline import FrameContext, Pipeline, draw_histogram
+from core.stats import SparsityStats
+from core.tiles import TileCacheBank
 
 class RetinaProcessor:
     """
@@ -15,10 +19,52 @@ class RetinaProcessor:
         self.sigma2 = 2.0
         self.gain = 10.0
 
+        # 变化感知模式 (默认关闭)：静态场景只重算发生变化的 tile
+        self.tile_cache = None
+        self.dirty_ratio = 1.0
+
+        # 最近一帧各流水线阶段的耗时 (ms)
+        self.last_timings = {}
+
+        # 稀疏性统计直接作用于带符号的 DoG 响应，gain 决定响应的量纲
+        self.stats = SparsityStats()
+
+        self.pipelines = {}
+        self._build_pipelines()
+
+    def _build_pipelines(self):
+        """
+        内置模式 -> 视网膜回路。
+        0/1 直通 (CLAHE 尚未实现)，2 边缘通路，3 神经节 DoG。
+        """
+        self.pipelines = {
+            2: Pipeline().add("gray").add("canny", low=100, high=200).add("to_bgr"),
+            3: (Pipeline()
+                .add("gray")
+                .add("dog", sigma1=self.sigma1, sigma2=self.sigma2)
+                .add("tap", key="dog")   # 带符号的 DoG 交给稀疏性统计
+                .add("normalize", alpha=0, beta=255, dtype=-1)
+                .add("to_uint8")   # 与上一步融合为一次 8 位归一化
+                .add("colormap", cmap=cv2.COLORMAP_JET)),
+        }
+
+    def set_change_detection(self, enabled, tile_size=32, threshold=8):
+        """
+        开启/关闭变化感知模式。
+        threshold 是降采样灰度图上的帧差阈值 (0-255)，超过即判定 tile 为脏。
+        开启后每帧的脏 tile 比例记录在 self.dirty_ratio。
+        """
+        if enabled:
+            self.tile_cache = TileCacheBank(tile_size, threshold)
+        else:
+            self.tile_cache = None
+        self.dirty_ratio = 1.0
+
     def update_params(self, s1, s2, gain=10.0):
         self.sigma1 = max(0.1, s1)
         self.sigma2 = max(0.1, s2)
         self.gain = gain
+        self._build_pipelines()
 
     def process_frame(self, frame, mode):
         if frame is None:
@@ -39,37 +85,24 @@ class RetinaProcessor:
             print(f"💥 UMat Conversion Failed: {e}")
             return frame, None
 
-        output_u = None # 存储 UMat 格式的输出
-
         try:
-            # 3. 这里的操作全部基于 UMat，OpenCV 会在内部处理，不回退到 Python
-            if len(frame.shape) == 3:
-                u_gray = cv2.cvtColor(u_frame, cv2.COLOR_BGR2GRAY)
-            else:
-                u_gray = u_frame
-
-            # 4. 算法分流
-            if mode == 0: # 原图
-                output_u = u_frame
-            elif mode == 1: # 对比度
-                # CLAHE 需要特殊处理，先做基础转换
-                # UMat 也可以直接操作，但在 Mac 上可能有变数，这里保持简单
-                output_u = u_frame 
-            elif mode == 2: # 边缘
-                u_edges = cv2.Canny(u_gray, 100, 200)
-                output_u = cv2.cvtColor(u_edges, cv2.COLOR_GRAY2BGR)
-            elif mode == 3: # Ganglion DoG
-                output_u = self._mode_ganglion_simulation_umat(u_gray)
-            
-            # 5. 如果 output_u 还是 None (比如 mode=1没实现)，回退原图
-            if output_u is None:
-                output_u = u_frame
+            # 3. 按模式取出对应的视网膜回路 (也可以直接传入自定义的 Pipeline)
+            #    所有阶段都基于 UMat，OpenCV 会在内部处理，不回退到 Python
+            pipeline = mode if isinstance(mode, Pipeline) else self.pipelines.get(mode)
+            ctx = FrameContext(u_frame, channels=frame.shape[2] if frame.ndim == 3 else 1,
+                               tile_cache=self.tile_cache)
+
+            # 4. 未实现的模式 (比如 mode=1) 回退原图
+            output_u = pipeline.run(ctx) if pipeline is not None else u_frame
+            if ctx.dirty_ratio is not None:
+                self.dirty_ratio = ctx.dirty_ratio
+            self.last_timings = ctx.timings
 
         except Exception as e:
             print(f"⚠️ UMat Algorithm Error: {e}")
             return frame, None
 
-        # 6. 最后时刻：从 UMat 取回 Numpy 数组用于显示
+        # 5. 最后时刻：从 UMat 取回 Numpy 数组用于显示
         # .get() 是 UMat 转 Numpy 的标准方法
         try:
             output = output_u.get()
@@ -79,55 +112,16 @@ class RetinaProcessor:
              print(f"⚠️ UMat Retrieval Error: {e}")
              return frame, None
 
-        # 7. 直方图 (用 Numpy 算，因为快)
-        hist_img = self._draw_histogram(output if mode != 3 else output_u.get())
-            
-        return output, hist_img
-
-    def _mode_ganglion_simulation_umat(self, u_gray):
-        # UMat 版本的算法，全程在 C++ 内存中漫游
-        
-        # 转换浮点 (OpenCV 内部函数)
-        # CV_32F = 5
-        u_float = cv2.normalize(u_gray, None, 0, 1.0, cv2.NORM_MINMAX, dtype=cv2.CV_32F)
-        
-        # GaussianBlur 支持 UMat
-        g1 = cv2.GaussianBlur(u_float, (0, 0), self.sigma1)
-        g2 = cv2.GaussianBlur(u_float, (0, 0), self.sigma2)
-        
-        # DoG
-        dog = cv2.subtract(g1, g2)
-        
-        # Normalize
-        dog_norm = cv2.normalize(dog, None, 0, 255, cv2.NORM_MINMAX)
-        
-        # Convert back to uint8
-        dog_uint8 = cv2.convertScaleAbs(dog_norm)
-        
-        # Heatmap
-        heatmap = cv2.applyColorMap(dog_uint8, cv2.COLORMAP_JET)
-        
-        return heatmap
-
-    def _draw_histogram(self, src_img):
-        # 直方图部分保持不变，因为它是纯 Python 逻辑，不涉及复杂的 C++ 传递
-        if src_img is None: return None
-        if isinstance(src_img, cv2.UMat):
-            src_img = src_img.get()
-            
-        if len(src_img.shape) == 3:
-            gray = cv2.cvtColor(src_img, cv2.COLOR_BGR2GRAY)
+        # 6. 直方图：DoG 回路统计带符号响应的稀疏性；
+        #    回路里自带 histogram 阶段时直接用它的结果，否则画输出的灰度直方图
+        #    这一步不在流水线里，单独计时记为 "stats"
+        t0 = time.perf_counter()
+        if "dog" in ctx.outputs:
+            hist_img = self.stats.update(ctx.outputs["dog"], self.gain).render()
         else:
-            gray = src_img
-            
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        cv2.normalize(hist, hist, 0, 100, cv2.NORM_MINMAX)
-        
-        h, w = 100, 256
-        hist_img = np.zeros((h, w, 3), dtype=np.uint8)
-        cv2.line(hist_img, (0, 50), (256, 50), (40, 40, 40), 1)
-        points = []
-        for i in range(256):
-            points.append((i, h - int(hist[i])))
-        cv2.polylines(hist_img, [np.array(points)], False, (0, 255, 0), 1)
-        return hist_img
\ No newline at end of file
+            hist_img = ctx.outputs.get("hist")
+            if hist_img is None:
+                hist_img = draw_histogram(output)
+        ctx.timings["stats"] = (time.perf_counter() - t0) * 1000.0
+
+        return output, hist_img
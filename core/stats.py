@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+
+METRICS = ("silent_frac", "on_frac", "off_frac", "mean_abs", "rms", "l1_l2", "kurtosis")
+
+
+def response_metrics(dog, gain, silent_thresh=0.1):
+    """
+    在带符号的 DoG 响应上计算稀疏性指标 (响应 = gain * DoG)：
+    静默像素比例、ON/OFF 比例、平均绝对响应、RMS、L1/L2 比值与峰度。
+    每个中间量只算一遍：二阶/四阶矩共用 c2，RMS 由方差和均值推出，
+    OFF 比例是静默和 ON 的补集。
+    """
+    r = np.asarray(dog, dtype=np.float32).ravel()
+    if gain != 1.0:
+        r = r * np.float32(gain)
+    n = max(1, r.size)
+    a = np.abs(r)
+    mean = float(r.mean())
+    c = r - np.float32(mean)
+    c2 = c * c
+    var = float(c2.mean())
+    m4 = float(np.dot(c2, c2)) / n
+    mean_abs = float(a.mean())
+    rms = float(np.sqrt(var + mean * mean))
+    silent = float(np.count_nonzero(a < silent_thresh)) / n
+    on = float(np.count_nonzero(r >= silent_thresh)) / n
+    return {
+        "silent_frac": silent,
+        "on_frac": on,
+        "off_frac": max(0.0, 1.0 - silent - on),
+        "mean_abs": mean_abs,
+        "rms": rms,
+        "l1_l2": mean_abs / rms if rms > 0 else 0.0,
+        "kurtosis": m4 / (var * var) - 3.0 if var > 0 else 0.0,
+    }
+
+
+class SparsityStats:
+    """
+    稀疏性统计引擎
+    直接在带符号的 DoG 响应上统计 (而不是着色后的 JET 热力图)，
+    按 stride 隔点抽样，直方图和各项指标都用指数滑动平均 (EMA) 平滑，
+    绘制时整条折线一次性交给 cv2.polylines，没有 Python 逐 bin 循环。
+    """
+
+    def __init__(self, bins=128, hist_range=1.0, stride=4, alpha=0.2, silent_thresh=0.1):
+        self.bins = bins
+        self.hist_range = hist_range   # 直方图覆盖 [-hist_range, +hist_range] (已乘 gain)
+        self.stride = max(1, int(stride))
+        self.alpha = alpha
+        self.silent_thresh = silent_thresh
+        self.reset()
+
+    def reset(self):
+        self.hist = None
+        self.metrics = None
+
+    def update(self, dog, gain=1.0):
+        if isinstance(dog, cv2.UMat):
+            dog = dog.get()
+        sample = dog[::self.stride, ::self.stride]
+
+        # 抽样 + 乘 gain 只做一次，直方图和指标共用
+        r = sample.ravel() * np.float32(gain)
+        # 等宽分箱直接算下标再 bincount，比 np.histogram 的通用路径快得多
+        R = self.hist_range
+        v = r[(r >= -R) & (r <= R)]
+        idx = ((v + np.float32(R)) * np.float32(self.bins / (2.0 * R))).astype(np.intp)
+        np.minimum(idx, self.bins - 1, out=idx)
+        hist = np.bincount(idx, minlength=self.bins).astype(np.float32) / max(1, r.size)
+        metrics = response_metrics(r, 1.0, self.silent_thresh)
+
+        if self.hist is None:
+            self.hist = hist
+            self.metrics = metrics
+        else:
+            a = self.alpha
+            self.hist += a * (hist - self.hist)
+            for k, v in metrics.items():
+                self.metrics[k] += a * (v - self.metrics[k])
+        return self
+
+    def render(self, h=100, w=256):
+        img = np.zeros((h, w, 3), dtype=np.uint8)
+        if self.hist is None:
+            return img
+
+        # 中线 = 0 响应；左侧 OFF，右侧 ON
+        cv2.line(img, (w // 2, 0), (w // 2, h), (40, 40, 40), 1)
+        # 对数刻度：静默峰值往往比尾部高几个数量级
+        y = np.log1p(self.hist * 1000.0)
+        peak = y.max()
+        if peak > 0:
+            y = y / peak
+        xs = np.linspace(0, w - 1, self.bins).astype(np.int32)
+        ys = (h - 1 - y * (h - 20)).astype(np.int32)
+        cv2.polylines(img, [np.column_stack((xs, ys))], False, (0, 255, 0), 1)
+
+        m = self.metrics
+        text = f"S {m['silent_frac']:.2f}  K {m['kurtosis']:.1f}  ON/OFF {m['on_frac']:.2f}/{m['off_frac']:.2f}"
+        cv2.putText(img, text, (4, 12), cv2.FONT_HERSHEY_PLAIN, 0.8, (136, 192, 208), 1, cv2.LINE_AA)
+        return img
@@ -0,0 +1,169 @@
+import cv2
+import numpy as np
+
+
+class StimulusSource:
+    """
+    确定性的合成视觉刺激 (可替代 cv2.VideoCapture)
+    视觉生理实验里的经典刺激：漂移光栅、移动光条、闪烁光斑、噪声、逼近 (loom)。
+    接口与 VideoCapture 一致 (isOpened / read / release / get)，
+    所以无摄像头的 Linux 服务器上也能直接喂给 RetinaProcessor 做测试和基准。
+
+    第 i 帧完全由 (kind, 参数, seed, i) 决定，同样的参数永远得到同样的帧序列。
+    read() 返回的是内部复用的缓冲区，下一次 read() 会覆盖它，需要保留请自行 copy()。
+    """
+
+    KINDS = ("grating", "bar", "spot", "noise", "loom")
+
+    def __init__(self, kind="grating", width=640, height=480, fps=30.0,
+                 n_frames=None, seed=0, precompute=False, **params):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown stimulus kind: {kind!r} (choose from {self.KINDS})")
+        if precompute and n_frames is None:
+            raise ValueError("precompute=True needs a finite n_frames")
+
+        self.kind = kind
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.n_frames = n_frames
+        self.seed = seed
+        self.params = params
+        self.pos = 0
+        self._opened = True
+
+        # 坐标网格只算一次 (以画面中心为原点)，之后每帧都是纯向量运算
+        ys, xs = np.mgrid[0:self.height, 0:self.width].astype(np.float32)
+        self._x = xs - (self.width - 1) / 2.0
+        self._y = ys - (self.height - 1) / 2.0
+        theta = np.deg2rad(params.get("orientation", 0.0))
+        # 沿运动方向的坐标
+        self._u = self._x * np.cos(theta) + self._y * np.sin(theta)
+        self._r = np.hypot(self._x, self._y)
+
+        # 复用的输出缓冲区
+        self._lum = np.empty((self.height, self.width), dtype=np.float32)
+        self._gray = np.empty((self.height, self.width), dtype=np.uint8)
+        self._bgr = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+        self._frames = None
+        if precompute:
+            self._frames = np.empty((n_frames, self.height, self.width, 3), dtype=np.uint8)
+            for i in range(n_frames):
+                self._frames[i] = self.render(i)
+
+    # ---------- VideoCapture 兼容接口 ----------
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        if self.n_frames is not None and self.pos >= self.n_frames:
+            return False, None
+        if self._frames is not None:
+            frame = self._frames[self.pos]
+        else:
+            frame = self.render(self.pos)
+        self.pos += 1
+        return True, frame
+
+    def release(self):
+        self._opened = False
+        self._frames = None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.n_frames) if self.n_frames is not None else -1.0
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.pos)
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.pos = max(0, int(value))
+            return True
+        return False
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield frame
+
+    # ---------- 刺激生成 ----------
+
+    def render(self, index):
+        """生成第 index 帧 (BGR uint8)，写入并返回内部缓冲区。"""
+        t = index / self.fps
+        p = self.params
+        mean = p.get("mean", 0.5)
+        contrast = p.get("contrast", 1.0)
+        lum = self._lum
+
+        if self.kind == "grating":
+            # 漂移正弦光栅: 空间频率 cycles/px，时间频率 Hz
+            sf = p.get("spatial_freq", 0.02)
+            tf = p.get("temporal_freq", 2.0)
+            np.multiply(self._u, 2 * np.pi * sf, out=lum)
+            lum -= 2 * np.pi * tf * t
+            np.sin(lum, out=lum)
+            if p.get("square", False):
+                np.sign(lum, out=lum)
+            lum *= 0.5 * contrast
+            lum += mean
+
+        elif self.kind == "bar":
+            # 移动光条: 从画面一侧扫到另一侧后循环
+            bar_w = p.get("bar_width", 20.0)
+            speed = p.get("speed", 200.0)
+            span = float(np.abs(self._u).max()) * 2 + bar_w
+            center = (speed * t) % span - span / 2.0
+            lum.fill(mean - 0.5 * contrast)
+            lum[np.abs(self._u - center) <= bar_w / 2.0] = mean + 0.5 * contrast
+
+        elif self.kind == "spot":
+            # 闪烁光斑: 周期 period 秒，占空比 duty
+            radius = p.get("radius", min(self.width, self.height) / 6.0)
+            period = p.get("period", 1.0)
+            duty = p.get("duty", 0.5)
+            lum.fill(mean - 0.5 * contrast)
+            if (t % period) < duty * period:
+                lum[self._r <= radius] = mean + 0.5 * contrast
+
+        elif self.kind == "noise":
+            # 块状白噪声，每帧用 (seed, index) 独立播种，支持随机访问
+            block = max(1, int(p.get("block", 1)))
+            rng = np.random.default_rng((self.seed, index))
+            gh, gw = -(-self.height // block), -(-self.width // block)
+            coarse = rng.random((gh, gw), dtype=np.float32)
+            if block > 1:
+                coarse = np.repeat(np.repeat(coarse, block, axis=0), block, axis=1)
+            lum[:] = coarse[:self.height, :self.width]
+            lum -= 0.5
+            lum *= contrast
+            lum += mean
+
+        elif self.kind == "loom":
+            # 逼近刺激: 暗圆盘按速度 px/s 扩张，超出画面后重新开始
+            r0 = p.get("start_radius", 5.0)
+            speed = p.get("speed", 100.0)
+            r_max = float(self._r.max())
+            radius = r0 + (speed * t) % max(r_max - r0, 1.0)
+            lum.fill(mean + 0.5 * contrast)
+            lum[self._r <= radius] = mean - 0.5 * contrast
+
+        np.clip(lum, 0.0, 1.0, out=lum)
+        lum *= 255.0
+        np.rint(lum, out=lum)
+        self._gray[:] = lum
+        cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGR, dst=self._bgr)
+        return self._bgr
@@ -0,0 +1,156 @@
+import csv
+import itertools
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from core.framestore import INDEX_FILE, FrameStore, build_frame_store
+from core.pipeline import unit_float
+from core.stats import METRICS, response_metrics
+
+
+def make_grid(sigma1s, sigma2s, gains=(10.0,)):
+    """(σ1, σ2, gain) 的笛卡尔积，σ 与 RetinaProcessor.update_params 一样下限 0.1。"""
+    return [(max(0.1, float(s1)), max(0.1, float(s2)), float(g))
+            for s1, s2, g in itertools.product(sigma1s, sigma2s, gains)]
+
+
+def _evaluate(frames, grid, silent_thresh):
+    """对一批帧计算所有参数组合的指标总和，返回 (sums, 帧数)。"""
+    sigmas = sorted({s for s1, s2, _ in grid for s in (s1, s2)})
+    sums = np.zeros((len(grid), len(METRICS)), dtype=np.float64)
+    n = 0
+    for frame in frames:
+        # 灰度 + 浮点转换每帧只做一次，每个不同的 σ 只模糊一次，所有组合共享
+        # 输入缩放与 dog 阶段一致，扫描结果可以直接和实时面板对照
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        u_float = unit_float(None, gray)
+        blurs = {s: cv2.GaussianBlur(u_float, (0, 0), s) for s in sigmas}
+        dogs = {}
+        for k, (s1, s2, gain) in enumerate(grid):
+            dog = dogs.get((s1, s2))
+            if dog is None:
+                dog = dogs[(s1, s2)] = cv2.subtract(blurs[s1], blurs[s2])
+            m = response_metrics(dog, gain, silent_thresh)
+            sums[k] += [m[name] for name in METRICS]
+        n += 1
+    return sums, n
+
+
+def _evaluate_store_chunk(path, indices, grid, silent_thresh):
+    # 子进程里重新打开 memmap，只需要传路径和帧号，不用 pickle 整帧数据
+    store = FrameStore(path)
+    return _evaluate((store[i] for i in indices), grid, silent_thresh)
+
+
+def _chunks(seq, n):
+    size = max(1, -(-len(seq) // n))
+    return [seq[i:i + size] for i in range(0, len(seq), size)]
+
+
+def sweep(source, grid, workers=None, silent_thresh=0.1, stride=1, max_frames=None):
+    """
+    在一组帧上评估参数网格，返回每个 (σ1, σ2, gain) 的平均指标表 (list of dict)。
+    source 可以是帧仓库目录 / FrameStore、视频路径、或者任意可迭代的帧源 (如 StimulusSource)。
+    工作按帧切块分给进程池，每个进程内部对所有组合共享模糊结果。
+    """
+    workers = workers or os.cpu_count() or 1
+    store_path = None
+    if isinstance(source, FrameStore):
+        store_path = source.path
+    elif isinstance(source, (str, os.PathLike)):
+        if not os.path.isfile(os.path.join(source, INDEX_FILE)):
+            # 视频文件先解码一次写进临时帧仓库 (只存灰度，扫描本来也只用灰度)，
+            # 之后和帧仓库走同一条路：子进程按帧号读 memmap，不用 pickle 整段解码结果
+            with tempfile.TemporaryDirectory(prefix="pyretina-sweep-") as tmp:
+                limit = max_frames * stride if max_frames is not None else None
+                build_frame_store(source, tmp, max_frames=limit, gray=True)
+                return sweep(tmp, grid, workers=workers, silent_thresh=silent_thresh,
+                             stride=stride, max_frames=max_frames)
+        store_path = os.fspath(source)
+
+    if store_path is not None:
+        indices = list(range(len(FrameStore(store_path))))[::stride][:max_frames]
+        jobs = [(_evaluate_store_chunk, (store_path, chunk, grid, silent_thresh))
+                for chunk in _chunks(indices, workers * 2)]
+    else:
+        frames = _load_frames(source, stride, max_frames)
+        jobs = [(_evaluate, (chunk, grid, silent_thresh))
+                for chunk in _chunks(frames, workers * 2)]
+
+    sums = np.zeros((len(grid), len(METRICS)), dtype=np.float64)
+    n = 0
+    if workers <= 1 or len(jobs) <= 1:
+        results = [fn(*args) for fn, args in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fn, *args) for fn, args in jobs]
+            results = [f.result() for f in futures]
+    for chunk_sums, chunk_n in results:
+        sums += chunk_sums
+        n += chunk_n
+    if n == 0:
+        raise ValueError("No frames to sweep over")
+
+    means = sums / n
+    return [dict(sigma1=s1, sigma2=s2, gain=g, frames=n, **dict(zip(METRICS, row.tolist())))
+            for (s1, s2, g), row in zip(grid, means)]
+
+
+def _load_frames(source, stride=1, max_frames=None):
+    # 按需截断，无限长的源 (比如 n_frames=None 的 StimulusSource) 也能正常结束；
+    # 很多源会复用输出缓冲区，每帧都要各自拷贝一份
+    stop = max_frames * stride if max_frames is not None else None
+    return [np.array(frame, copy=True) for frame in itertools.islice(source, 0, stop, stride)]
+
+
+def format_table(rows):
+    cols = ["sigma1", "sigma2", "gain"] + list(METRICS)
+    lines = ["  ".join(f"{c:>11}" for c in cols)]
+    for row in rows:
+        lines.append("  ".join(f"{row[c]:>11.4f}" for c in cols))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sweep DoG receptive-field parameters over a frame set.")
+    parser.add_argument("source", help="frame store directory, video file, or stimulus:<kind>")
+    parser.add_argument("--sigma1", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--sigma2", type=float, nargs="+", default=[2.0])
+    parser.add_argument("--gain", type=float, nargs="+", default=[10.0])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--silent-thresh", type=float, default=0.1)
+    parser.add_argument("--csv", default=None, help="write the table to this CSV file")
+    args = parser.parse_args(argv)
+
+    source = args.source
+    if source.startswith("stimulus:"):
+        from core.stimulus import StimulusSource
+        # 给了 --max-frames 就不限长度，由 sweep 里的 islice 按 max_frames * stride 截断
+        n_frames = None if args.max_frames else 60 * args.stride
+        stim = StimulusSource(source.split(":", 1)[1], n_frames=n_frames)
+        source = stim
+
+    grid = make_grid(args.sigma1, args.sigma2, args.gain)
+    rows = sweep(source, grid, workers=args.workers, silent_thresh=args.silent_thresh,
+                 stride=args.stride, max_frames=args.max_frames)
+    print(format_table(rows))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
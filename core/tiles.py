@@ -0,0 +1,137 @@
+import collections
+
+import cv2
+import numpy as np
+
+from core.pipeline import unit_float
+
+
+class TileDoGCache:
+    """
+    分块变化检测 + DoG 结果缓存 (Change-Aware Mode)
+    静态场景下每 30ms 重算整帧 DoG 是纯粹的浪费。
+    这里先在降采样的灰度图上做帧差，找出发生变化的 tile，
+    只对这些 tile 及其高斯核影响范围 (halo) 重新模糊，其余位置复用上一帧的 DoG。
+    """
+
+    def __init__(self, tile_size=32, threshold=8, downsample=4):
+        self.tile_size = int(tile_size)
+        self.threshold = threshold
+        # 降采样倍数必须整除 tile 边长，保证每个 tile 对应整数个小图像素
+        self.downsample = max(1, min(int(downsample), self.tile_size))
+        while self.tile_size % self.downsample:
+            self.downsample -= 1
+
+        self.dirty_ratio = 1.0
+        self.reset()
+
+    def reset(self):
+        self._ref_small = None   # 每个 tile 最近一次重算时的降采样参考帧
+        self._dog = None         # 缓存的 float32 DoG (未归一化)
+        self._key = None         # (shape, sigma1, sigma2)，任何一项变化都必须整帧重算
+
+    @staticmethod
+    def halo(sigma1, sigma2):
+        # OpenCV 对 float32 自动选核: ksize = round(8σ + 1) | 1，半径约 4σ
+        return int(np.ceil(4.0 * max(sigma1, sigma2))) + 1
+
+    def update(self, gray, sigma1, sigma2):
+        """
+        输入 uint8 灰度图，返回 float32 的 DoG 响应。
+        输入缩放与 dog 阶段相同 (固定 1/255，见 pipeline.unit_float)：
+        如果逐帧 NORM_MINMAX，任何一个像素的亮度变化都会改变全局 min/max，缓存全部失效。
+        """
+        h, w = gray.shape[:2]
+        ts, ds = self.tile_size, self.downsample
+        rows, cols = -(-h // ts), -(-w // ts)
+
+        # 1. 降采样 (INTER_AREA 相当于块平均，抗噪且很便宜)
+        small = cv2.resize(gray, (-(-w // ds), -(-h // ds)), interpolation=cv2.INTER_AREA)
+
+        key = (gray.shape, sigma1, sigma2)
+        if self._dog is None or key != self._key:
+            self._key = key
+            self._ref_small = small.copy()
+            self._dog = self._dog_region(gray, sigma1, sigma2)
+            self.dirty_ratio = 1.0
+            return self._dog
+
+        # 2. 帧差 -> 每个 tile 的最大变化量
+        diff = cv2.absdiff(small, self._ref_small)
+        step = ts // ds
+        sh, sw = diff.shape
+        padded = np.zeros((rows * step, cols * step), dtype=diff.dtype)
+        padded[:sh, :sw] = diff
+        tile_max = padded.reshape(rows, step, cols, step).max(axis=(1, 3))
+        dirty = tile_max > self.threshold
+
+        self.dirty_ratio = float(dirty.mean())
+        if not dirty.any():
+            return self._dog
+
+        # 3. 只刷新脏 tile 的参考帧，缓慢漂移会一直累积直到超过阈值
+        dirty_small = np.repeat(np.repeat(dirty, step, axis=0), step, axis=1)[:sh, :sw]
+        self._ref_small[dirty_small] = small[dirty_small]
+
+        if self.dirty_ratio > 0.5:
+            # 大面积变化时，分块的额外开销不划算，直接整帧重算
+            self._dog = self._dog_region(gray, sigma1, sigma2)
+            return self._dog
+
+        # 4. 每一行里连续的脏 tile 合并成一个矩形，减少 GaussianBlur 调用次数
+        #    tile 内的像素变化会通过高斯核影响到周围 halo 范围内的输出，
+        #    所以输出区域要外扩一个 halo，输入裁剪再外扩一个 halo
+        halo = self.halo(sigma1, sigma2)
+        for r in range(rows):
+            c = 0
+            while c < cols:
+                if not dirty[r, c]:
+                    c += 1
+                    continue
+                c0 = c
+                while c < cols and dirty[r, c]:
+                    c += 1
+                y0, y1 = max(0, r * ts - halo), min(h, (r + 1) * ts + halo)
+                x0, x1 = max(0, c0 * ts - halo), min(w, c * ts + halo)
+                # 贴到图像边缘时裁剪区域自然落回 BORDER_REFLECT_101，结果与整帧一致
+                cy0, cy1 = max(0, y0 - halo), min(h, y1 + halo)
+                cx0, cx1 = max(0, x0 - halo), min(w, x1 + halo)
+                region = self._dog_region(gray[cy0:cy1, cx0:cx1], sigma1, sigma2)
+                self._dog[y0:y1, x0:x1] = region[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0]
+
+        return self._dog
+
+    @staticmethod
+    def _dog_region(gray, sigma1, sigma2):
+        f = unit_float(None, gray)
+        g1 = cv2.GaussianBlur(f, (0, 0), sigma1)
+        g2 = cv2.GaussianBlur(f, (0, 0), sigma2)
+        return cv2.subtract(g1, g2)
+
+
+class TileCacheBank:
+    """
+    按 DoG 阶段分开的 TileDoGCache 集合。
+    一条自定义回路里可能有多个不同 σ 的 DoG，如果共用一个缓存，
+    每次调用都会因为 key 变化而整帧重算。这里按 (血统, σ1, σ2) 各给一份，
+    并用 LRU 限制数量，拖动滑块产生的旧 σ 缓存会被自动淘汰。
+    """
+
+    def __init__(self, tile_size=32, threshold=8, max_entries=8):
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._caches = collections.OrderedDict()
+
+    def get(self, key):
+        cache = self._caches.get(key)
+        if cache is None:
+            cache = self._caches[key] = TileDoGCache(self.tile_size, self.threshold)
+            while len(self._caches) > self.max_entries:
+                self._caches.popitem(last=False)
+        else:
+            self._caches.move_to_end(key)
+        return cache
+
+    def reset(self):
+        self._caches.clear()
@@ -1,3 +1,4 @@
+import time
 import cv2
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QComboBox, QFileDialog, QGroupBox,
@@ -5,6 +6,8 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt6.QtCore import QTimer, Qt
 from PyQt6.QtGui import QImage, QPixmap, QFont
 from core.retina import RetinaProcessor
+from core.perf import PerfCounters
+from core.framestore import FrameStore
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -14,6 +17,13 @@ class MainWindow(QWidget):
         self.cap = None
         self.is_camera = False
         self.current_frame = None
+
+        # 性能计数器：update_frame / process_frame / show_image 周围的廉价计时
+        self.perf = PerfCounters()
+        self.frame_interval = 30   # 采集定时器周期 (ms)
+        self._stream_start = None   # 第一次定时器触发的时刻
+        self._last_slot = 0         # 最近一次触发对应的周期序号
+        self.perf_timer = QTimer()   # 面板刷新单独节流，避免监控本身抢帧
         
         self.init_ui()
 
@@ -56,6 +66,9 @@ class MainWindow(QWidget):
         self.btn_cam = QPushButton("启动实时视频流")
         self.btn_cam.setStyleSheet("color: #a3be8c;") 
         self.btn_cam.clicked.connect(self.toggle_camera)
+
+        self.btn_store = QPushButton("回放帧仓库 (Frame Store)")
+        self.btn_store.clicked.connect(self.open_store)
         
         self.combo_mode = QComboBox()
         self.combo_mode.addItems([
@@ -71,6 +84,7 @@ class MainWindow(QWidget):
         l_input.addWidget(self.combo_mode)
         l_input.addWidget(self.btn_img)
         l_input.addWidget(self.btn_cam)
+        l_input.addWidget(self.btn_store)
         l_input.addStretch()
         box_input.setLayout(l_input)
         
@@ -108,6 +122,12 @@ class MainWindow(QWidget):
         self.lbl_hist.setStyleSheet("background-color: #000; border: 1px solid #333;")
         l_data.addWidget(QLabel("时空信号强度直方图 (Sparsity)"))
         l_data.addWidget(self.lbl_hist)
+
+        # 实时性能面板
+        self.lbl_perf = QLabel("等待数据...")
+        self.lbl_perf.setStyleSheet("color: #a3be8c; font-family: Menlo, Consolas, monospace; font-size: 11px;")
+        l_data.addWidget(QLabel("实时性能 (Performance)"))
+        l_data.addWidget(self.lbl_perf)
         l_data.addStretch()
         box_data.setLayout(l_data)
         
@@ -120,6 +140,8 @@ class MainWindow(QWidget):
         
         self.setLayout(main_layout)
         self.timer.timeout.connect(self.update_frame)
+        self.perf_timer.timeout.connect(self.refresh_perf)
+        self.perf_timer.start(500)
 
     def create_monitor_screen(self, title):
         frame = QFrame()
@@ -162,39 +184,103 @@ class MainWindow(QWidget):
             self.current_frame = cv2.imread(path)
             self.process_and_display()
 
+    def open_store(self):
+        # 回放用 core.framestore 预先构建的帧仓库，后台线程预读，面板里能看到队列深度
+        path = QFileDialog.getExistingDirectory(self, "Open Frame Store")
+        if not path: return
+        try:
+            reader = FrameStore(path).reader(loop=True)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Frame Store Error: {e}")
+            return
+        if self.is_camera: self.stop_stream()
+        self.start_stream(reader)
+
     def toggle_camera(self):
         if not self.is_camera:
-            self.cap = cv2.VideoCapture(0)
-            if self.cap.isOpened():
-                self.is_camera = True
-                self.btn_cam.setText("停止采集 (Stop)")
-                self.btn_cam.setStyleSheet("color: #bf616a;") 
-                self.timer.start(30)
+            cap = cv2.VideoCapture(0)
+            if cap.isOpened():
+                self.start_stream(cap)
         else:
-            self.timer.stop()
-            self.cap.release()
-            self.is_camera = False
-            self.btn_cam.setText("启动实时视频流")
-            self.btn_cam.setStyleSheet("color: #a3be8c;") 
+            self.stop_stream()
+
+    def start_stream(self, cap):
+        self.cap = cap
+        self.is_camera = True
+        self.btn_cam.setText("停止采集 (Stop)")
+        self.btn_cam.setStyleSheet("color: #bf616a;") 
+        self.perf.reset()
+        self._stream_start = None
+        self.timer.start(self.frame_interval)
+
+    def stop_stream(self):
+        self.timer.stop()
+        self.cap.release()
+        self.is_camera = False
+        self.btn_cam.setText("启动实时视频流")
+        self.btn_cam.setStyleSheet("color: #a3be8c;") 
 
     def update_frame(self):
+        # 按开始采集以来的总时长换算本次触发应处的周期序号，跳过的序号就是被丢掉的帧；
+        # 用绝对序号而不是两次触发的间隔，每次不足一个周期的延迟也会累积起来
+        now = time.perf_counter()
+        if self._stream_start is None:
+            self._stream_start = now
+            self._last_slot = 0
+        else:
+            slot = round((now - self._stream_start) * 1000.0 / self.frame_interval)
+            missed = slot - self._last_slot - 1
+            if missed > 0:
+                self.perf.mark_dropped(missed)
+            self._last_slot = max(self._last_slot, slot)
+
         if self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
+            with self.perf.timed("capture"):
+                ret, frame = self.cap.read()
             if ret:
+                if frame.ndim == 2:   # 单通道帧仓库
+                    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
                 self.current_frame = frame
                 self.process_and_display()
+            else:
+                self.perf.mark_dropped()
 
     def process_and_display(self):
         if self.current_frame is None: return
 
         mode = self.combo_mode.currentIndex()
-        processed, hist = self.processor.process_frame(self.current_frame.copy(), mode)
-        
-        self.show_image(self.current_frame, self.view_original.display_lbl)
-        self.show_image(processed, self.view_processed.display_lbl)
-        
-        if hist is not None:
-            self.show_image(hist, self.lbl_hist, is_bgr=False) 
+        with self.perf.timed("process"):
+            processed, hist = self.processor.process_frame(self.current_frame.copy(), mode)
+        self.perf.record_pipeline(self.processor.last_timings)
+
+        with self.perf.timed("display"):
+            self.show_image(self.current_frame, self.view_original.display_lbl)
+            self.show_image(processed, self.view_processed.display_lbl)
+
+            if hist is not None:
+                self.show_image(hist, self.lbl_hist, is_bgr=False)
+        self.perf.mark_frame()
+
+    def refresh_perf(self):
+        if not self.isVisible() or self.perf.frames == 0:
+            return
+        snap = self.perf.snapshot()
+        # 预读型数据源 (FrameStoreReader) 才有队列，摄像头直接读取视为 0
+        depth = self.cap.qsize() if self.is_camera and hasattr(self.cap, "qsize") else 0
+
+        lines = [
+            f"FPS {snap['fps']:5.1f}   丢帧 {snap['dropped']}",
+            f"队列 {depth}   {'峰值内存' if self.perf.memory_is_peak else '内存'} {snap['memory_mb']:.0f} MB",
+        ]
+        if self.processor.tile_cache is not None:
+            lines.append(f"脏块比例 {self.processor.dirty_ratio:.0%}")
+        for name, ms in snap["stages_ms"].items():
+            lines.append(f"{name:<20}{ms:6.2f} ms")
+            if name == "process":
+                # 流水线内部阶段缩进显示在 process 之下
+                for stage, stage_ms in snap["pipeline_ms"].items():
+                    lines.append(f"  {stage:<18}{stage_ms:6.2f} ms")
+        self.lbl_perf.setText("\n".join(lines))
 
     def show_image(self, cv_img, label_widget, is_bgr=True):
         if cv_img is None: return
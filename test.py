@@ -28,4 +28,134 @@ try:
 except Exception as e:
     print("   -> CAMERA ERROR:", e)
 
-print("4. Done.")
\ No newline at end of file
+# 下面两项不依赖硬件，任何一项失败都以非零状态退出
+failed = False
+
+try:
+    # 测试合成刺激 (不依赖摄像头，无头服务器也能跑)
+    print("4. Testing Synthetic Stimulus Pipeline...")
+    from core.retina import RetinaProcessor
+    from core.stimulus import StimulusSource
+    processor = RetinaProcessor()
+    for kind in StimulusSource.KINDS:
+        src = StimulusSource(kind, width=160, height=120, n_frames=5, seed=0)
+        for frame in src:
+            out, hist = processor.process_frame(frame.copy(), 3)
+            # process_frame 出错时会返回 (原图, None)，这里必须显式检查
+            assert hist is not None, "process_frame returned no histogram"
+            assert out.shape == (120, 160, 3), f"unexpected output shape {out.shape}"
+
+        # 确定性：同一帧号渲染两次、以及 seek 之后 read() 的结果必须完全一致
+        first = src.render(3).copy()
+        assert (src.render(3) == first).all(), "render() is not deterministic"
+        src.set(cv2.CAP_PROP_POS_FRAMES, 3)
+        ret, again = src.read()
+        assert ret and (again == first).all(), "read() after seek differs from render()"
+        twin = StimulusSource(kind, width=160, height=120, n_frames=5, seed=0)
+        assert (twin.render(3) == first).all(), "same seed gave a different frame"
+        src.release()
+        print(f"   -> {kind}: OK. Output shape:", out.shape)
+except Exception as e:
+    failed = True
+    print("   -> STIMULUS ERROR:", e)
+
+try:
+    # 变化感知模式：分块重算的结果必须与整帧计算逐像素一致
+    print("5. Testing Change-Aware Tile Path...")
+    full = RetinaProcessor()
+    tiled = RetinaProcessor()
+    tiled.set_change_detection(True, tile_size=32, threshold=0)
+    src = StimulusSource("bar", width=320, height=240, n_frames=8, bar_width=12, speed=150)
+    ratios = []
+    for frame in src:
+        ref, _ = full.process_frame(frame.copy(), 3)
+        out, _ = tiled.process_frame(frame.copy(), 3)
+        assert (out == ref).all(), "tile path differs from full-frame DoG"
+        assert tiled.stats.metrics == full.stats.metrics, "sparsity stats differ"
+        ratios.append(tiled.dirty_ratio)
+    # 第一帧整帧计算，之后只有光条经过的几列 tile 变脏；静止帧不应有脏块
+    assert ratios[0] == 1.0 and all(0.0 < r < 0.5 for r in ratios[1:]), f"dirty ratios {ratios}"
+    tiled.process_frame(frame.copy(), 3)
+    assert tiled.dirty_ratio == 0.0, f"static frame dirty ratio {tiled.dirty_ratio}"
+    print("   -> Tile path OK. Dirty ratios:", " ".join(f"{r:.2f}" for r in ratios))
+except Exception as e:
+    failed = True
+    print("   -> TILE PATH ERROR:", e)
+
+try:
+    # 异步流：两路并发的流各有自己的处理器，EMA 直方图必须与各自单独运行时一致
+    print("6. Testing Concurrent Async Streams...")
+    import asyncio
+    from core.aio import AsyncRetina
+
+    def make_source(kind):
+        return StimulusSource(kind, width=160, height=120, n_frames=12, seed=1)
+
+    def standalone(kind):
+        p = RetinaProcessor()
+        return [p.process_frame(f.copy(), 3)[1].copy() for f in make_source(kind)]
+
+    async def run_streams(kinds):
+        async with AsyncRetina(mode=3, max_in_flight=3) as retina:
+            async def collect(kind):
+                return [hist for _, hist in [r async for r in retina.stream(make_source(kind))]]
+            return await asyncio.gather(*(collect(k) for k in kinds))
+
+    kinds = ("bar", "grating")
+    for kind, hists in zip(kinds, asyncio.run(run_streams(kinds))):
+        ref = standalone(kind)
+        assert len(hists) == len(ref), f"{kind}: {len(hists)} frames, expected {len(ref)}"
+        assert all((a == b).all() for a, b in zip(hists, ref)), f"{kind}: histograms differ"
+    print("   -> Streams OK:", ", ".join(kinds))
+except Exception as e:
+    failed = True
+    print("   -> ASYNC STREAM ERROR:", e)
+
+try:
+    # 帧仓库：随机帧号的随机访问、以及预读读取器的顺序都必须与直接渲染一致
+    print("7. Testing Frame Store...")
+    import random
+    import tempfile
+    from core.framestore import build_frame_store
+    src = StimulusSource("noise", width=160, height=120, n_frames=24, seed=2)
+    with tempfile.TemporaryDirectory(prefix="pyretina-test-") as tmp:
+        store = build_frame_store(src, tmp)
+        assert len(store) == 24, f"store has {len(store)} frames"
+        i = random.randrange(len(store))
+        assert (store[i] == src.render(i)).all(), f"store[{i}] differs from the rendered frame"
+        reader = store.reader(prefetch=4)
+        positions = []
+        for frame in reader:
+            assert (frame == src.render(reader.pos)).all(), f"reader frame {reader.pos} differs"
+            positions.append(reader.pos)
+        reader.release()
+        assert positions == list(range(24)), f"reader order {positions}"
+        del store, reader   # 先释放 memmap，临时目录才能删掉
+    print(f"   -> Frame store OK. Checked store[{i}] and {len(positions)} frames in order.")
+except Exception as e:
+    failed = True
+    print("   -> FRAME STORE ERROR:", e)
+
+if __name__ == "__main__":
+    # spawn 方式启动的子进程会重新导入本脚本，进程池只能在主进程里开
+    try:
+        # 参数扫描：多进程分块的结果必须与单进程一致 (只有求和顺序不同)
+        print("8. Testing Parameter Sweep Workers...")
+        from core.stats import METRICS
+        from core.sweep import make_grid, sweep
+        grid = make_grid([0.8, 1.5], [2.0, 3.0], [5.0, 10.0])
+        tables = [sweep(StimulusSource("spot", width=160, height=120, n_frames=16, seed=3),
+                        grid, workers=workers, stride=2) for workers in (1, 2)]
+        assert [r["frames"] for r in tables[1]] == [r["frames"] for r in tables[0]], "frame counts differ"
+        for a, b in zip(*tables):
+            assert (a["sigma1"], a["sigma2"], a["gain"]) == (b["sigma1"], b["sigma2"], b["gain"]), "grid order differs"
+            assert all(abs(a[m] - b[m]) <= 1e-9 * max(1.0, abs(a[m])) for m in METRICS), \
+                f"workers=2 differs at {(a['sigma1'], a['sigma2'], a['gain'])}"
+        print(f"   -> Sweep OK. {len(grid)} combinations over {tables[0][0]['frames']} frames.")
+    except Exception as e:
+        failed = True
+        print("   -> SWEEP ERROR:", e)
+
+print("9. Done.")
+if failed:
+    raise SystemExit(1)
\ No newline at end of file